@@ -1,70 +1,146 @@
 #!/usr/bin/python3
-import subprocess, sys, os
+import subprocess, sys, os, time
 from datetime import date, timedelta, datetime
-from letters import stringToMatrix
+from letters import stringToColumns
 from logo import logo
 
-def add_random_letter_to_file(repo, file_name):
-    command = f'cd {repo} && echo "a" >> {file_name}' 
-    subprocess.call(command, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+SEPARATOR = "-" * 70
+STATUS_INTERVAL = 0.25
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+DAY_OFFSETS = tuple(timedelta(days = day) for day in range(7))
 
-def git_add_all_to_stage(repo):
-    command = f'cd {repo} && git add .'
-    subprocess.call(command, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    
-def git_commit_with_specified_date(repo, date, commit_message = None):
-    command = f'cd {repo} && git commit --date="{date}" -m "{date}"'
-    subprocess.call(command, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+def get_head_ref(repo):
+    result = subprocess.run(["git", "symbolic-ref", "HEAD"], cwd=repo, stdout=subprocess.PIPE, text=True, check=True)
+    return result.stdout.strip()
+
+def get_head_commit(repo):
+    result = subprocess.run(["git", "rev-parse", "--verify", "-q", "HEAD"], cwd=repo, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    return result.stdout.strip() or None
+
+def get_committer_ident(repo):
+    result = subprocess.run(["git", "var", "GIT_COMMITTER_IDENT"], cwd=repo, stdout=subprocess.PIPE, text=True, check=True)
+    # drop the trailing "<timestamp> <tz>" fields, every commit gets its own date
+    return result.stdout.strip().rsplit(" ", 2)[0]
+
+def read_file_contents(repo, file_name):
+    try:
+        with open(os.path.join(repo, file_name), "rb") as f:
+            return bytearray(f.read())
+    except FileNotFoundError:
+        return bytearray()
+
+def open_fast_import(repo):
+    # a large pipe buffer lets many small commit blocks go out in a single write
+    return subprocess.Popen(["git", "fast-import", "--date-format=raw", "--quiet"], cwd=repo, stdin=subprocess.PIPE, bufsize=1 << 16)
+
+def format_commit_header(ref, committer, date):
+    # commits are day aligned, so plain ordinal arithmetic gives the UTC timestamp
+    timestamp = (date.toordinal() - EPOCH_ORDINAL) * 86400
+    message = str(date)
+    return f"commit {ref}\ncommitter {committer} {timestamp} +0000\ndata {len(message)}\n{message}\n".encode()
+
+def stream_commit(proc, header, parent = None):
+    proc.stdin.write(header)
+    if parent:
+        proc.stdin.write(f"from {parent}\n".encode())
+
+def stream_file(proc, file_name, contents):
+    proc.stdin.write(b"M 644 inline %s\ndata %d\n" % (file_name.encode(), len(contents)))
+    # the bytearray goes to the pipe buffer as is, it is never copied into a bytes object
+    proc.stdin.write(contents)
+    proc.stdin.write(b"\n")
 
-def make_commit_with_specified_date(repo, date, commit_message = None):
-    add_random_letter_to_file(repo, "test")
-    git_add_all_to_stage(repo)
-    git_commit_with_specified_date(repo, date, commit_message)
+def make_commit_with_specified_date(proc, header, file_name, contents, parent = None):
+    contents.extend(b"a\n")
+    stream_commit(proc, header, parent)
+    stream_file(proc, file_name, contents)
+
+def close_fast_import(proc):
+    proc.stdin.close()
+    if proc.wait() != 0:
+        raise subprocess.CalledProcessError(proc.returncode, proc.args)
+
+def sync_working_tree(repo, file_name):
+    # fast-import only moves the branch, bring the index and the art file up to date
+    subprocess.run(["git", "reset", "-q"], cwd=repo, check=True, stdout=subprocess.DEVNULL)
+    subprocess.run(["git", "checkout", "--", file_name], cwd=repo, check=True, stdout=subprocess.DEVNULL)
 
 def git_push_to_remote_repo(repo):
-    command = f"cd {repo} && git push"
     print(f"Pushing...", end="\r")
-    subprocess.call(command, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    subprocess.run(["git", "push"], cwd=repo, check=True, stdout=subprocess.DEVNULL)
     print(f"Pushed successfully!")
-    print("-" * 70)
+    print(SEPARATOR)
     
 def clone_repo_if_not_exists_already(username, repo, protocol = "ssh"):
     if protocol == "ssh":
-        command = f"git clone git@github.com:{username}/{repo}.git"
+        url = f"git@github.com:{username}/{repo}.git"
     elif protocol == "https":
-        command = f"git clone https://github.com/{username}/{repo}.git"
+        url = f"https://github.com/{username}/{repo}.git"
         
     if not os.path.exists(repo):
-        subprocess.call(command, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        subprocess.run(["git", "clone", url], check=True, stdout=subprocess.DEVNULL)
 
 
 
 
-def execute(repo, date, numbers_of_commits_per_day = 1):
+def columns_to_dates(columns, start_date):
+    # one column is one week, only the set bits (the drawn days) are visited
+    dates = []
+    for col, column in enumerate(columns):
+        if not column:
+            continue
+        week_start = start_date + timedelta(weeks = col)
+        while column:
+            row = (column & -column).bit_length() - 1
+            dates.append(week_start + DAY_OFFSETS[row])
+            column &= column - 1
+    return dates
+
+def print_status(commits, total_commits, elapsed):
+    # the ETA uses the average time of all the commits so far, not just the first one
+    eta = elapsed / commits * (total_commits - commits)
+    percentage = (commits / total_commits) * 100
+    sys.stdout.write(f"Status: Commits: {commits} -- {percentage:.2f}% -- ETA: {timedelta(seconds=int(eta))}\r")
+    sys.stdout.flush()
+
+def execute(repo, dates, numbers_of_commits_per_day = 1, file_name = "test"):
     commits = 0
     total_commits = len(dates) * numbers_of_commits_per_day
-    time_per_commit = None
-    print("Info:")
-    print(f"Number of dates: {len(dates)}")
-    print(f"Number of commits per day: {numbers_of_commits_per_day}")
-    print(f"Number of commits: {total_commits}")
-    print("-" * 70)
+    print("\n".join([
+        "Info:",
+        f"Number of dates: {len(dates)}",
+        f"Number of commits per day: {numbers_of_commits_per_day}",
+        f"Number of commits: {total_commits}",
+        SEPARATOR,
+    ]))
+    ref = get_head_ref(repo)
+    parent = get_head_commit(repo)
+    committer = get_committer_ident(repo)
+    contents = read_file_contents(repo, file_name)
+    proc = open_fast_import(repo)
+    # the live status line is only useful on a terminal, redirected output just gets the summary
+    show_status = sys.stdout.isatty()
+    start_time = last_status_time = time.perf_counter()
     for date in dates:
+        # the date, and with it the whole commit header, is the same for every commit of the day
+        header = format_commit_header(ref, committer, date)
         for i in range(numbers_of_commits_per_day):
-            if not time_per_commit:
-                start_time = datetime.now()
-                make_commit_with_specified_date(repo, date)
-                end_time = datetime.now()
-                time_per_commit = (end_time - start_time).total_seconds()
+            if i == 0:
+                make_commit_with_specified_date(proc, header, file_name, contents, parent)
+                parent = None
             else:
-                make_commit_with_specified_date(repo, date)
-            eta = time_per_commit * (total_commits - commits)
-            formatted_eta = str(timedelta(seconds=int(eta)))
+                # the other commits of the day keep the same tree, no new blob is written
+                stream_commit(proc, header)
             commits += 1
-            percentage = (commits / total_commits) * 100
-            print(f"Status: Commits: {commits} -- {percentage:.2f}% -- ETA: {formatted_eta}", end="\r")
+            if show_status:
+                now = time.perf_counter()
+                if now - last_status_time >= STATUS_INTERVAL:
+                    last_status_time = now
+                    print_status(commits, total_commits, now - start_time)
+    close_fast_import(proc)
+    sync_working_tree(repo, file_name)
     print(f"Commits: {commits} -- 100%")
-    print("-" * 70)
+    print(SEPARATOR)
     
 if __name__ == "__main__":
     
@@ -79,25 +155,26 @@ if __name__ == "__main__":
     start_date = datetime.strptime(sys.argv[3], '%y/%m/%d')
     number_of_commits_per_day = int(sys.argv[4]) if len(sys.argv) > 4 else 1
     
-    dates = []
-    actual_date = start_date
-    message_matrix = stringToMatrix(message)
-    for col in range(len(message_matrix[0])):
-        for row in range(len(message_matrix)):
-            if message_matrix[row][col] == 1:
-                dates.append(actual_date)
-            actual_date += timedelta(days = 1)
+    message_columns = stringToColumns(message)
+    dates = columns_to_dates(message_columns, start_date)
+    if not dates:
+        # blank message, there is no cell to draw so don't even touch the repo
+        print(f"Nothing to draw for message {message!r}.")
+        sys.exit(1)
 
     
     # Start
-    print("-" * 70)
-    print(logo)
-    print("-" * 70)
-    print(f"Starting write {message} to {username}'s github history.")
-    print(f"Using repo: {username}/{repo}")
-    print("-" * 70)
+    banner = [SEPARATOR]
+    if sys.stdout.isatty():
+        banner += [logo, SEPARATOR]
+    banner += [
+        f"Starting write {message} to {username}'s github history.",
+        f"Using repo: {username}/{repo}",
+        SEPARATOR,
+    ]
+    print("\n".join(banner))
     clone_repo_if_not_exists_already(username, repo)
     execute(repo, dates, number_of_commits_per_day)
     git_push_to_remote_repo(repo)
     print("Art completed")
-    print("-" * 70)
\ No newline at end of file
+    print(SEPARATOR)
\ No newline at end of file
@@ -403,30 +403,39 @@ CHAR_MATRICES = {
     
 }
 
+# every glyph column packed into one int, bit n being row n (0 = sunday)
+CHAR_COLUMNS = {
+    char: tuple(sum(cell << row for row, cell in enumerate(column)) for column in zip(*matrix))
+    for char, matrix in CHAR_MATRICES.items()
+}
+
 def charToMatrix(char):
     return CHAR_MATRICES[char]
 
-def stringToMatrix(string, spaces = 1):
-    solution = [[], [], [], [], [], [], []]
-    for letter in string:
-        mat = charToMatrix(letter)
-        for row in range(0, len(mat)):
-            for col in range(0, len(mat[row])):
-                solution[row].append(mat[row][col])
-            
-            if (string.index(letter) != len(string) - 1):
-                for i in range(spaces):
-                    solution[row].append(0)
+def charToColumns(char):
+    return CHAR_COLUMNS[char]
+
+def stringToColumns(string, spaces = 1):
+    solution = []
+    for i, letter in enumerate(string):
+        solution.extend(charToColumns(letter))
+        if i != len(string) - 1:
+            solution.extend((0,) * spaces)
     return solution
 
+def columnsToMatrix(columns):
+    return [[(column >> row) & 1 for column in columns] for row in range(7)]
+
+def stringToMatrix(string, spaces = 1):
+    # the packed columns are the one canonical layout, the row matrix is only a view of them
+    return columnsToMatrix(stringToColumns(string, spaces))
+
+# maps the 0/1 cells of a row straight to their preview characters
+PREVIEW_TABLE = bytes.maketrans(b"\x00\x01", b" X")
+
 def printMatrix(matrix):
     for row in matrix:
-        for col in row:
-            if (col == 1):
-                print("X", end="")
-            else:
-                print(" ", end="")
-        print()
+        print(bytes(row).translate(PREVIEW_TABLE).decode())
         
 if __name__ == "__main__":
     import sys